@@ -3,7 +3,7 @@
 CLI entrypoint for the video/document transcript pipeline.
 
 Usage:
-  python3 main.py <file_path_or_url> [--video-id ID] [--subject SUBJECT] [--chapter CHAPTER] [--chapter-id ID] [--part PART] [--user-id USER_ID] 
+  python3 main.py <file_path_or_url> [--video-id ID] [--subject SUBJECT] [--chapter CHAPTER] [--chapter-id ID] [--part PART] [--user-id USER_ID] [--max-workers N]
 
   file_path_or_url: Local path (video, PDF, DOCX) or direct link (YouTube, etc.).
 
@@ -19,6 +19,12 @@ import sys
 from src.pipeline import process_upload
 
 
+def _preview(text: str | None, n: int = 200) -> str:
+    """Return the first n characters of text, with "..." if it was cut."""
+    text = text or ""
+    return text if len(text) <= n else text[:n] + "..."
+
+
 def main() -> int:
     parser = argparse.ArgumentParser(
         description="Process teacher uploads: video (transcribe → PDF) or PDF/DOCX → store in vector DB."
@@ -46,6 +52,13 @@ def main() -> int:
         default="chroma_db",
         help="ChromaDB persist directory",
     )
+    parser.add_argument(
+        "--max-workers",
+        type=int,
+        default=8,
+        dest="max_workers",
+        help="Number of audio chunks transcribed concurrently (video only, default: 8)",
+    )
     args = parser.parse_args()
 
     metadata = {
@@ -64,22 +77,23 @@ def main() -> int:
         output_audio_dir=args.audio_dir,
         output_transcript_dir=args.transcript_dir,
         chroma_dir=args.chroma_dir,
+        max_workers=args.max_workers,
     )
 
     if result.get("success"):
         print("Success.")
         if result.get("transcript_text"):
-            t = result["transcript_text"]
-            print("Transcript (preview):", t[:200] + "..." if len(t) > 200 else t)
+            print("Transcript (preview):", _preview(result["transcript_text"]))
         if result.get("pdf_path"):
             print("Transcript PDF:", result["pdf_path"])
         if result.get("text"):
-            t = result["text"]
-            print("Extracted text (preview):", t[:200] + "..." if len(t) > 200 else t)
+            print("Extracted text (preview):", _preview(result["text"]))
         print("Vector DB doc_id:", result.get("doc_id", ""))
         return 0
     else:
         print("Failed:", result.get("error", "Unknown error"), file=sys.stderr)
+        if result.get("doc_id"):
+            print("Vector DB doc_id (stored before the failure):", result["doc_id"], file=sys.stderr)
         return 1
 
 
@@ -15,10 +15,10 @@ Usage:
 """
 
 import argparse
-import json
 import os
 import sys
 
+import orjson
 from dotenv import load_dotenv
 
 from src.vector_store import list_all_documents, query_vector_db
@@ -27,6 +27,17 @@ from src.vector_store import list_all_documents, query_vector_db
 load_dotenv()
 
 
+def _dumps(obj) -> str:
+    """Pretty-print obj as JSON (orjson; non-JSON values fall back to str)."""
+    return orjson.dumps(obj, option=orjson.OPT_INDENT_2, default=str).decode()
+
+
+def _preview(text: str | None, n: int = 300) -> str:
+    """Return the first n characters of text, with "..." if it was cut."""
+    text = text or ""
+    return text if len(text) <= n else text[:n] + "..."
+
+
 def main() -> int:
     parser = argparse.ArgumentParser(
         description="Query ChromaDB: semantic search or list all stored docs with metadata."
@@ -75,6 +86,26 @@ def main() -> int:
         default=os.environ.get("GEMINI_API_KEY"),
         help="Gemini API key (default: GEMINI_API_KEY env var).",
     )
+    parser.add_argument(
+        "--rerank",
+        action=argparse.BooleanOptionalAction,
+        default=False,
+        help="For --ask: rerank top passages with a cross-encoder before sending them to Gemini "
+        "(requires sentence-transformers; default: off).",
+    )
+    parser.add_argument(
+        "--force-retrieval",
+        action="store_true",
+        dest="force_retrieval",
+        help="For --ask: always retrieve passages before calling Gemini, instead of letting "
+        "Gemini call the course-material search tool only when needed.",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        dest="no_cache",
+        help="For --ask: skip the semantic answer cache and always query ChromaDB + Gemini.",
+    )
     parser.add_argument(
         "--json",
         action="store_true",
@@ -90,9 +121,12 @@ def main() -> int:
             video_id=args.video_id or None,
             api_key=args.api_key,
             persist_directory=args.chroma_dir,
+            use_cache=not args.no_cache,
+            rerank=args.rerank,
+            force_retrieval=args.force_retrieval,
         )
         if args.json:
-            print(json.dumps(result, indent=2, default=str))
+            print(_dumps(result))
             return 0
         if not result["success"]:
             print("Error:", result.get("error", "Unknown error"), file=sys.stderr)
@@ -109,7 +143,7 @@ def main() -> int:
     if args.list:
         data = list_all_documents(persist_directory=args.chroma_dir)
         if args.json:
-            print(json.dumps(data, indent=2, default=str))
+            print(_dumps(data))
             return 0
         print("=== ChromaDB: All stored passages (chunks) with metadata ===\n")
         print(f"Total chunks: {data['count']}\n")
@@ -121,9 +155,8 @@ def main() -> int:
             total = (meta or {}).get("total_chunks")
             label = f"passage {chunk_idx + 1} of {total}" if chunk_idx is not None and total is not None else "full doc"
             print(f"--- Chunk {i} (id: {doc_id}) | from: {filename} [{label}] ---")
-            print("Metadata:", json.dumps(meta, indent=2, default=str))
-            preview = (doc_text or "")[:300] + "..." if len(doc_text or "") > 300 else (doc_text or "")
-            print("Passage:", preview)
+            print("Metadata:", _dumps(meta))
+            print("Passage:", _preview(doc_text))
             print()
         return 0
 
@@ -136,7 +169,7 @@ def main() -> int:
         persist_directory=args.chroma_dir,
     )
     if args.json:
-        print(json.dumps(result, indent=2, default=str))
+        print(_dumps(result))
         return 0
     print("=== ChromaDB: Most relevant passages (chunks) for your question ===\n")
     print("Your question:", args.query)
@@ -158,7 +191,7 @@ def main() -> int:
         total = (meta or {}).get("total_chunks")
         label = f"chunk {chunk_idx + 1} of {total}" if chunk_idx is not None and total is not None else "full doc"
         print(f"--- Passage {i} (distance: {dist}) | from: {filename} [{label}] ---")
-        print("Metadata:", json.dumps(meta, indent=2, default=str))
+        print("Metadata:", _dumps(meta))
         # Show full chunk (it's a short passage, ~500 chars)
         print("Passage:", doc_text or "")
         print()
@@ -1,5 +1,5 @@
 """Video transcript pipeline: video/doc/pdf upload → transcript → PDF → vector DB."""
 
-from src.pipeline import process_upload
+from src.pipeline import process_upload, process_uploads
 
-__all__ = ["process_upload"]
+__all__ = ["process_upload", "process_uploads"]
@@ -1,9 +1,12 @@
 """Generate precise, educational answers from vector DB context using Google Gemini."""
 
+import functools
 import os
-from typing import Any
+from pathlib import Path
+from typing import Any, Callable
 
-from src.vector_store import query_vector_db
+from src.semantic_cache import SemanticCache
+from src.vector_store import embed_query, get_collection_version, query_vector_db
 
 
 LEARNING_PORTAL_SYSTEM_PROMPT = """You are an expert teaching assistant for a learning portal. Your role is to answer student questions based ONLY on the provided course material (transcripts and documents).
@@ -15,6 +18,59 @@ Rules:
 - Keep answers focused and concise but complete enough for learning.
 - You may cite the source (e.g. "From the chapter on Motion...") when it helps clarity."""
 
+RETRIEVAL_TOOL_INSTRUCTIONS = """
+Course material is not included up front. Call the search_course_material tool to look it up before answering any question about the course content; you may call it again with a refined query if the first results are not enough.
+For greetings, thanks, or other small talk that needs no course material, reply briefly without calling the tool."""
+
+
+RERANK_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+# Dense-retrieval candidates fetched before reranking down to n_results
+RERANK_CANDIDATES = 40
+
+
+@functools.lru_cache(maxsize=8)
+def _get_answer_cache(path: str) -> SemanticCache:
+    """One SemanticCache per cache file, shared across calls in this process."""
+    return SemanticCache(path)
+
+
+@functools.lru_cache(maxsize=4)
+def _get_client(api_key: str):
+    """Create the Gemini client once per API key and reuse its HTTP connections across calls."""
+    from google import genai
+
+    return genai.Client(api_key=api_key)
+
+
+@functools.lru_cache(maxsize=None)
+def _get_reranker(model_name: str = RERANK_MODEL):
+    """Load the cross-encoder once per process (requires sentence-transformers)."""
+    from sentence_transformers import CrossEncoder
+
+    return CrossEncoder(model_name)
+
+
+def rerank_passages(
+    question: str,
+    documents: list[str],
+    metadatas: list[dict],
+    top_n: int,
+) -> tuple[list[str], list[dict]]:
+    """
+    Reorder passages by cross-encoder relevance to the question and keep the best top_n.
+
+    The cross-encoder scores question and passage jointly, which is more precise than
+    the bi-encoder distance used for retrieval.
+
+    Returns:
+        (passage texts, metadata dicts), most relevant first.
+    """
+    if not documents:
+        return documents, metadatas
+    scores = _get_reranker().predict([(question, doc or "") for doc in documents])
+    order = sorted(range(len(documents)), key=lambda i: scores[i], reverse=True)[:top_n]
+    return [documents[i] for i in order], [metadatas[i] for i in order]
+
 
 def get_context_from_vector_db(
     question: str,
@@ -22,11 +78,16 @@ def get_context_from_vector_db(
     video_id: str | None = None,
     persist_directory: str = "chroma_db",
     collection_name: str = "teacher_content",
+    query_embedding: list[float] | None = None,
+    rerank: bool = False,
 ) -> tuple[list[str], list[dict[str, Any]]]:
     """
     Get the most relevant passages from the vector DB for a question.
 
     If video_id is provided, only chunks from that video (metadata video_id) are searched.
+    Pass query_embedding if the question has already been embedded.
+    If rerank is True, RERANK_CANDIDATES passages are retrieved and a cross-encoder
+    picks the best n_results of them.
 
     Returns:
         (list of passage texts, list of metadata dicts).
@@ -34,13 +95,16 @@ def get_context_from_vector_db(
     where = {"video_id": video_id} if video_id else None
     result = query_vector_db(
         query_text=question,
-        n_results=n_results,
+        n_results=max(n_results, RERANK_CANDIDATES) if rerank else n_results,
         where=where,
         persist_directory=persist_directory,
         collection_name=collection_name,
+        query_embedding=query_embedding,
     )
     documents = result.get("documents") or []
     metadatas = result.get("metadatas") or []
+    if rerank:
+        return rerank_passages(question, documents, metadatas, top_n=n_results)
     return documents, metadatas
 
 
@@ -48,16 +112,11 @@ def build_context_block(documents: list[str], metadatas: list[dict]) -> str:
     """Build a single context string from passages and their metadata."""
     parts = []
     for i, (doc, meta) in enumerate(zip(documents, metadatas), 1):
-        filename = (meta or {}).get("filename", "Unknown")
-        subject = (meta or {}).get("subject", "")
-        chapter = (meta or {}).get("chapter", "")
-        source = f"[Source {i}: {filename}"
-        if subject or chapter:
-            source += f" — {subject}"
-            if chapter:
-                source += f", {chapter}"
-        source += "]\n"
-        parts.append(source + (doc or ""))
+        meta = meta or {}
+        subject = meta.get("subject", "")
+        chapter = meta.get("chapter", "")
+        topic = f" — {subject}, {chapter}" if chapter else (f" — {subject}" if subject else "")
+        parts.append(f"[Source {i}: {meta.get('filename', 'Unknown')}{topic}]\n{doc or ''}")
     return "\n\n---\n\n".join(parts)
 
 
@@ -85,15 +144,13 @@ def generate_answer_with_gemini(
             "Gemini API key required. Set GEMINI_API_KEY environment variable or pass api_key=..."
         )
 
-    from google import genai
-
-    client = genai.Client(api_key=api_key)
+    from google.genai import types
 
-    full_prompt = f"""{LEARNING_PORTAL_SYSTEM_PROMPT}
+    client = _get_client(api_key)
 
----
-
-## Course material (use only this to answer):
+    # The system prompt is sent as system_instruction: an identical prefix on every request,
+    # which Gemini 2.5 models serve from their implicit prefix cache. Only the tail varies.
+    contents = f"""## Course material (use only this to answer):
 
 {context_text}
 
@@ -109,7 +166,50 @@ Provide a precise, clear answer suitable for a learning portal based only on the
 
     response = client.models.generate_content(
         model=model,
-        contents=full_prompt,
+        contents=contents,
+        config=types.GenerateContentConfig(system_instruction=LEARNING_PORTAL_SYSTEM_PROMPT),
+    )
+    return (response.text or "").strip()
+
+
+def generate_answer_with_tools(
+    question: str,
+    search_course_material: Callable[[str], str],
+    api_key: str | None = None,
+    model: str = "gemini-2.5-flash",
+) -> str:
+    """
+    Let Gemini answer the question, calling search_course_material only when it needs context.
+
+    The search function is registered as a Gemini function-calling tool and run by the SDK
+    whenever the model calls it, so small talk is answered without touching the vector DB.
+
+    Args:
+        question: The student's question.
+        search_course_material: Tool function (query -> context text); its docstring is the
+            tool description sent to Gemini.
+        api_key: Gemini API key. If None, uses env var GEMINI_API_KEY.
+        model: Gemini model name (default gemini-2.5-flash).
+
+    Returns:
+        Generated answer text.
+    """
+    api_key = api_key or os.environ.get("GEMINI_API_KEY")
+    if not api_key:
+        raise ValueError(
+            "Gemini API key required. Set GEMINI_API_KEY environment variable or pass api_key=..."
+        )
+
+    from google.genai import types
+
+    client = _get_client(api_key)
+    response = client.models.generate_content(
+        model=model,
+        contents=question,
+        config=types.GenerateContentConfig(
+            system_instruction=LEARNING_PORTAL_SYSTEM_PROMPT + RETRIEVAL_TOOL_INSTRUCTIONS,
+            tools=[search_course_material],
+        ),
     )
     return (response.text or "").strip()
 
@@ -122,26 +222,94 @@ def ask_question(
     model: str = "gemini-2.5-flash",
     persist_directory: str = "chroma_db",
     collection_name: str = "teacher_content",
+    use_cache: bool = True,
+    rerank: bool = False,
+    force_retrieval: bool = False,
 ) -> dict[str, Any]:
     """
     Answer a question using vector DB context + Google Gemini (learning portal).
 
     If video_id is provided, the answer is generated only from that video's vector data.
 
-    1. Retrieves relevant passages from the vector DB (optionally filtered by video_id).
-    2. Sends question + passages to Gemini to generate a precise answer.
+    By default retrieval is a Gemini tool (search_course_material) that the model calls only
+    when the question needs course material; with force_retrieval=True passages are always
+    retrieved first and sent along with the question (steps 2-3 below).
+
+    1. Looks up a semantically similar, previously answered question in the answer cache
+       (persist_directory/semantic_cache.npz); on a hit, returns that answer directly.
+       Cached answers are scoped to video_id, n_context and rerank, and are invalidated
+       whenever documents are added to the collection.
+    2. Retrieves relevant passages from the vector DB (optionally filtered by video_id),
+       optionally reranked with a cross-encoder (rerank=True).
+    3. Sends question + passages to Gemini to generate a precise answer, then caches it.
+
+    The cache is used only when sentence-transformers is installed (query embeddings are
+    computed outside Chroma); pass use_cache=False to always query Chroma and Gemini.
 
     Returns:
         dict with keys: answer, passages_used (list of dicts with text, metadata), success, error.
     """
     result = {"answer": "", "passages_used": [], "success": False, "error": None}
     try:
+        cache = None
+        query_embedding = None
+        # Answers from before the last upload to the collection, or with other retrieval
+        # settings, are never served
+        version = get_collection_version(persist_directory, collection_name)
+        scope = f"{collection_name}:{video_id or ''}:{n_context}:{int(rerank)}"
+        if use_cache:
+            query_embedding = embed_query(question)
+            if query_embedding is not None:
+                cache = _get_answer_cache(str(Path(persist_directory) / "semantic_cache.npz"))
+                cached = cache.get(query_embedding, scope=scope, version=version)
+                if cached is not None:
+                    return cached
+
+        if not force_retrieval:
+            passages: list[dict[str, Any]] = []
+
+            def search_course_material(query: str) -> str:
+                """
+                Search the course material (video transcripts and documents) for passages relevant to a query.
+
+                Args:
+                    query: What to look up, e.g. the student's question or a key concept from it.
+
+                Returns:
+                    The most relevant passages with their sources, or a note that nothing was found.
+                """
+                docs, metas = get_context_from_vector_db(
+                    query,
+                    n_results=n_context,
+                    video_id=video_id,
+                    persist_directory=persist_directory,
+                    collection_name=collection_name,
+                    query_embedding=query_embedding if query == question else None,
+                    rerank=rerank,
+                )
+                passages.extend({"text": doc, "metadata": meta} for doc, meta in zip(docs, metas))
+                if not docs:
+                    return "No relevant course material found."
+                return build_context_block(docs, metas)
+
+            result["answer"] = generate_answer_with_tools(
+                question, search_course_material, api_key=api_key, model=model
+            )
+            result["passages_used"] = passages
+            result["success"] = True
+            # Only cache answers grounded in retrieved material
+            if cache is not None and passages:
+                cache.set(query_embedding, result, scope=scope, version=version)
+            return result
+
         documents, metadatas = get_context_from_vector_db(
             question,
             n_results=n_context,
             video_id=video_id,
             persist_directory=persist_directory,
             collection_name=collection_name,
+            query_embedding=query_embedding,
+            rerank=rerank,
         )
         if not documents:
             if video_id:
@@ -163,6 +331,8 @@ def ask_question(
         )
         result["answer"] = answer
         result["success"] = True
+        if cache is not None:
+            cache.set(query_embedding, result, scope=scope, version=version)
     except Exception as e:
         result["error"] = str(e)
     return result
@@ -1,65 +1,124 @@
-"""Extract audio from video files using pydub (requires ffmpeg)."""
+"""Extract audio from video files and stream it as PCM chunks using ffmpeg."""
 
 import os
+import subprocess
+from collections.abc import Iterator
 from pathlib import Path
 
-from pydub import AudioSegment
+
+def get_media_duration(media_path: str) -> float:
+    """
+    Return the duration of an audio/video file in seconds (via ffprobe).
+
+    Args:
+        media_path: Path to the audio or video file.
+
+    Returns:
+        Duration in seconds.
+    """
+    out = subprocess.run(
+        [
+            "ffprobe",
+            "-v", "error",
+            "-show_entries", "format=duration",
+            "-of", "default=noprint_wrappers=1:nokey=1",
+            media_path,
+        ],
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    return float(out.stdout.strip())
 
 
 def extract_audio_from_video(
     video_path: str,
     output_dir: str = "output_audio_files",
     output_format: str = "wav",
+    sample_rate: int = 16000,
+    channels: int = 1,
+    start: float | None = None,
+    duration: float | None = None,
 ) -> str:
     """
     Extract audio from a video file and save as WAV (or other format).
 
+    Audio is streamed through a single ffmpeg process, so it is never held in Python memory.
+    Pass start/duration to extract only a time range (the file name then includes the start).
+
     Args:
         video_path: Path to the video file.
         output_dir: Directory to save the extracted audio.
         output_format: Output format (wav recommended for speech recognition).
+        sample_rate: Output sample rate in Hz (default 16000, what speech recognition expects).
+        channels: Number of output channels (default 1, mono).
+        start: Optional start offset in seconds.
+        duration: Optional length in seconds to extract from start.
 
     Returns:
         Path to the extracted audio file.
     """
     Path(output_dir).mkdir(parents=True, exist_ok=True)
     base = Path(video_path).stem
-    out_path = os.path.join(output_dir, f"{base}_audio.{output_format}")
+    suffix = f"_{int(start)}s" if start is not None else ""
+    out_path = os.path.join(output_dir, f"{base}_audio{suffix}.{output_format}")
 
-    # Load video and export audio
-    audio = AudioSegment.from_file(video_path)
-    audio.export(out_path, format=output_format)
+    cmd = ["ffmpeg", "-y", "-loglevel", "error"]
+    if start is not None:
+        cmd += ["-ss", str(start)]
+    cmd += ["-i", video_path]
+    if duration is not None:
+        cmd += ["-t", str(duration)]
+    cmd += [
+        "-vn",
+        "-ac", str(channels),
+        "-ar", str(sample_rate),
+    ]
+    if output_format == "wav":
+        cmd += ["-acodec", "pcm_s16le"]
+    cmd.append(out_path)
+    subprocess.run(cmd, check=True)
     return out_path
 
 
-def split_audio_into_chunks(
+def iter_pcm_chunks(
     audio_path: str,
     chunk_length_ms: int = 30_000,
-    output_dir: str = "output_audio_files",
-) -> list[str]:
+    sample_rate: int = 16000,
+) -> Iterator[bytes]:
     """
-    Split audio into chunks (e.g. 30 seconds) for APIs with length limits.
+    Decode audio with one ffmpeg process and yield fixed-length raw PCM chunks from its stdout.
+
+    Nothing is written to disk. Chunks are 16-bit little-endian mono PCM at sample_rate;
+    each covers chunk_length_ms (the last one may be shorter).
 
     Args:
-        audio_path: Path to the audio file.
+        audio_path: Path to the audio (or video) file.
         chunk_length_ms: Length of each chunk in milliseconds (default 30 sec).
-        output_dir: Directory to save chunks.
+        sample_rate: Output sample rate in Hz (default 16000).
 
-    Returns:
-        List of paths to chunk files.
+    Yields:
+        Raw PCM bytes per chunk, in playback order.
     """
-    Path(output_dir).mkdir(parents=True, exist_ok=True)
-    base = Path(audio_path).stem
-
-    audio = AudioSegment.from_file(audio_path)
-    chunks: list[str] = []
-    start = 0
-    i = 0
-    while start < len(audio):
-        chunk = audio[start : start + chunk_length_ms]
-        out_path = os.path.join(output_dir, f"{base}_segment_{i}.wav")
-        chunk.export(out_path, format="wav")
-        chunks.append(out_path)
-        start += chunk_length_ms
-        i += 1
-    return chunks
+    chunk_bytes = sample_rate * 2 * chunk_length_ms // 1000
+    cmd = [
+        "ffmpeg", "-loglevel", "error",
+        "-i", audio_path,
+        "-vn",
+        "-ac", "1",
+        "-ar", str(sample_rate),
+        "-f", "s16le",
+        "pipe:1",
+    ]
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE)
+    try:
+        while chunk := proc.stdout.read(chunk_bytes):
+            yield chunk
+    except GeneratorExit:
+        proc.kill()  # Consumer stopped early
+        raise
+    finally:
+        proc.stdout.close()
+        returncode = proc.wait()
+    if returncode != 0:
+        raise subprocess.CalledProcessError(returncode, cmd)
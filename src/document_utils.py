@@ -1,54 +1,95 @@
 """Extract text from PDF and DOC/DOCX files."""
 
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
-from docx import Document
-from pypdf import PdfReader
+import pymupdf
+from lxml import etree
 
 
-def extract_text_from_pdf(pdf_path: str) -> str:
+_W_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_W_P = f"{_W_NS}p"
+# Run-level elements that contribute paragraph text (w:t carries text; the rest map to whitespace)
+_RUN_TEXT = {f"{_W_NS}tab": "\t", f"{_W_NS}br": "\n", f"{_W_NS}cr": "\n"}
+_RUN_TEXT_TAGS = (f"{_W_NS}t", *_RUN_TEXT)
+# Word writes text boxes twice (mc:Choice and a legacy mc:Fallback copy); only the first is read
+_MC_FALLBACK = "{http://schemas.openxmlformats.org/markup-compatibility/2006}Fallback"
+
+# Below this many pages, process start-up costs more than it saves (MuPDF is fast per page)
+PARALLEL_PDF_MIN_PAGES = 200
+
+
+def _extract_page_range(pdf_path: str, start: int, stop: int) -> list[str]:
+    """Extract text of pages [start, stop) with a fresh document (safe to run in a worker process)."""
+    with pymupdf.open(pdf_path) as doc:
+        return [doc[i].get_text("text") for i in range(start, stop)]
+
+
+def extract_text_from_pdf(pdf_path: str, max_workers: int | None = None) -> str:
     """
     Extract all text from a PDF file.
 
+    Uses PyMuPDF (native MuPDF). Large PDFs are split into page ranges extracted in parallel
+    worker processes.
+
     Args:
         pdf_path: Path to the PDF file.
+        max_workers: Worker processes for large PDFs (default: CPU count).
 
     Returns:
         Extracted text.
     """
-    reader = PdfReader(pdf_path)
-    parts: list[str] = []
-    for page in reader.pages:
-        text = page.extract_text()
-        if text:
-            parts.append(text)
-    return "\n".join(parts).strip()
+    workers = max_workers or os.cpu_count() or 1
+    with pymupdf.open(pdf_path) as doc:
+        n_pages = doc.page_count
+        parallel = n_pages >= PARALLEL_PDF_MIN_PAGES and workers >= 2
+        texts = [] if parallel else [page.get_text("text") for page in doc]
+    if parallel:
+        step = -(-n_pages // workers)  # ceil division: one contiguous range per worker
+        starts = range(0, n_pages, step)
+        stops = [min(start + step, n_pages) for start in starts]
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            ranges = executor.map(_extract_page_range, [pdf_path] * len(starts), starts, stops)
+            texts = [text for page_texts in ranges for text in page_texts]
+    return "\n".join(t for t in texts if t).strip()
 
 
 def extract_text_from_docx(doc_path: str) -> str:
     """
     Extract all text from a DOCX file.
 
+    Streams word/document.xml with lxml.iterparse, so memory stays flat for large documents.
+
     Args:
         doc_path: Path to the .docx file.
 
     Returns:
         Extracted text.
     """
-    doc = Document(doc_path)
     parts: list[str] = []
-    for para in doc.paragraphs:
-        if para.text.strip():
-            parts.append(para.text)
+    with zipfile.ZipFile(doc_path) as archive, archive.open("word/document.xml") as xml:
+        # No entity expansion: a crafted document must not be able to inline local files
+        for _, para in etree.iterparse(xml, events=("end",), tag=_W_P, resolve_entities=False):
+            if next(para.iterancestors(_MC_FALLBACK), None) is None:
+                text = "".join(_RUN_TEXT.get(el.tag, el.text or "") for el in para.iter(*_RUN_TEXT_TAGS))
+                if text.strip():
+                    parts.append(text)
+            # Free the paragraph and already-processed siblings
+            para.clear()
+            while para.getprevious() is not None:
+                del para.getparent()[0]
     return "\n".join(parts).strip()
 
 
-def extract_document_text(file_path: str) -> str | None:
+def extract_document_text(file_path: str, max_workers: int | None = None) -> str | None:
     """
     Extract text from a PDF or DOCX file based on extension.
 
     Args:
         file_path: Path to the file.
+        max_workers: Worker processes for large PDFs (default: CPU count; 1 disables).
 
     Returns:
         Extracted text or None if format not supported.
@@ -56,10 +97,10 @@ def extract_document_text(file_path: str) -> str | None:
     path = Path(file_path)
     suffix = path.suffix.lower()
     if suffix == ".pdf":
-        return extract_text_from_pdf(file_path)
+        return extract_text_from_pdf(file_path, max_workers=max_workers)
     if suffix in (".docx", ".doc"):
-        # python-docx only supports .docx; .doc would need another lib
+        # Only the OOXML .docx format is supported; .doc would need another lib
         if suffix == ".doc":
-            return None  # Legacy .doc not supported by python-docx
+            return None  # Legacy binary .doc is not supported
         return extract_text_from_docx(file_path)
     return None
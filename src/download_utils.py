@@ -1,11 +1,15 @@
 """Download video/audio from YouTube or direct URLs for pipeline processing."""
 
+import asyncio
+import functools
 import os
 import re
-import urllib.request
 from pathlib import Path
 from urllib.parse import urlparse
 
+import requests
+from requests.adapters import HTTPAdapter
+
 
 # Domains that yt-dlp handles well (YouTube, etc.)
 YT_DLP_DOMAINS = (
@@ -20,6 +24,20 @@ YT_DLP_DOMAINS = (
     "twitter.com",
     "x.com",
 )
+_YT_DLP_DOMAIN_SET = frozenset(YT_DLP_DOMAINS)
+
+# File names from direct URLs without one of these extensions get ".mp4" appended
+_MEDIA_EXT_RE = re.compile(r"\.(?:mp4|webm|mkv|mov|avi|m4a|mp3|wav)$", re.I)
+
+# Shared session: keep-alive connections are reused across downloads (no new TCP/TLS handshake)
+_SESSION = requests.Session()
+_SESSION.mount("http://", HTTPAdapter(pool_connections=16, pool_maxsize=16))
+_SESSION.mount("https://", HTTPAdapter(pool_connections=16, pool_maxsize=16))
+_USER_AGENT = "Mozilla/5.0 (compatible; video_transcript/1.0)"
+_SESSION.headers["User-Agent"] = _USER_AGENT
+
+# Max downloads in flight at once in download_media_batch
+MAX_CONCURRENT_DOWNLOADS = 8
 
 
 def is_url(path: str) -> bool:
@@ -28,14 +46,14 @@ def is_url(path: str) -> bool:
     return s.startswith("http://") or s.startswith("https://")
 
 
+@functools.lru_cache(maxsize=4096)
 def _is_yt_dlp_domain(url: str) -> bool:
-    """Return True if URL is from a domain best handled by yt-dlp."""
+    """Return True if URL is from a domain (or subdomain of one) best handled by yt-dlp."""
     try:
-        parsed = urlparse(url)
-        netloc = (parsed.netloc or "").lower().lstrip("www.")
-        return any(domain in netloc for domain in YT_DLP_DOMAINS)
+        host = (urlparse(url).hostname or "").removeprefix("www.")
     except Exception:
         return False
+    return host in _YT_DLP_DOMAIN_SET or any(host.endswith("." + d) for d in _YT_DLP_DOMAIN_SET)
 
 
 def _download_with_yt_dlp(url: str, output_dir: str) -> str:
@@ -77,42 +95,96 @@ def _download_with_yt_dlp(url: str, output_dir: str) -> str:
     candidate = os.path.join(output_dir, f"{vid}.{ext}")
     if os.path.isfile(candidate):
         return candidate
-    # Fallback: newest file in output_dir with video/audio ext
+    # Fallback: newest file in output_dir with video/audio ext (single scandir pass)
     exts = (".mp4", ".webm", ".mkv", ".m4a")
-    for f in sorted(Path(output_dir).iterdir(), key=lambda p: p.stat().st_mtime, reverse=True):
-        if f.suffix.lower() in exts:
-            return str(f)
-    raise FileNotFoundError("yt-dlp did not produce a recognizable file")
+    newest, newest_mtime = None, -1.0
+    with os.scandir(output_dir) as entries:
+        for entry in entries:
+            if entry.name.lower().endswith(exts) and entry.is_file():
+                mtime = entry.stat().st_mtime
+                if mtime > newest_mtime:
+                    newest, newest_mtime = entry.path, mtime
+    if newest is None:
+        raise FileNotFoundError("yt-dlp did not produce a recognizable file")
+    return newest
 
 
-def _download_direct_url(url: str, output_dir: str) -> str:
-    """Download from direct media URL (e.g. .mp4 link). Returns path to file."""
+def _unique_download_path(url: str, output_dir: str) -> str:
+    """Pick a not-yet-used file path for a direct URL and reserve it (creates an empty file)."""
     Path(output_dir).mkdir(parents=True, exist_ok=True)
     parsed = urlparse(url)
     name = os.path.basename(parsed.path or "video").strip() or "video"
-    if not re.search(r"\.(mp4|webm|mkv|mov|avi|m4a|mp3|wav)$", name, re.I):
+    if not _MEDIA_EXT_RE.search(name):
         name = name + ".mp4"
+    base, ext = os.path.splitext(name)
     path = os.path.join(output_dir, name)
-    # Avoid overwriting; make unique if needed
-    if os.path.isfile(path):
-        base, ext = os.path.splitext(name)
-        for i in range(1, 100):
+    # Avoid overwriting; creating the file exclusively keeps concurrent downloads apart
+    for i in range(1, 101):
+        try:
+            with open(path, "x"):
+                return path
+        except FileExistsError:
             path = os.path.join(output_dir, f"{base}_{i}{ext}")
-            if not os.path.isfile(path):
-                break
-    req = urllib.request.Request(url, headers={"User-Agent": "Mozilla/5.0 (compatible; video_transcript/1.0)"})
-    with urllib.request.urlopen(req, timeout=60) as resp:
-        with open(path, "wb") as f:
-            f.write(resp.read())
     return path
 
 
+def _remove_quietly(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _download_direct_url(url: str, output_dir: str) -> str:
+    """Download from direct media URL (e.g. .mp4 link). Returns path to file."""
+    path = _unique_download_path(url, output_dir)
+    try:
+        with _SESSION.get(url, stream=True, timeout=60) as resp:
+            resp.raise_for_status()
+            # Stream to disk in blocks (~1% of the file, 8 KB-1 MB) so memory stays O(block size)
+            length = int(resp.headers.get("Content-Length") or 0)
+            buffer_size = max(8192, min(1024 * 1024, length // 100 or 65536))
+            with open(path, "wb") as f:
+                for block in resp.iter_content(chunk_size=buffer_size):
+                    f.write(block)
+    except BaseException:
+        _remove_quietly(path)  # Reserved or partial file
+        raise
+    return path
+
+
+async def _download_direct_url_async(session, url: str, output_dir: str) -> str:
+    """Async variant of _download_direct_url using an aiohttp session and aiofiles."""
+    import aiofiles
+
+    path = _unique_download_path(url, output_dir)
+    try:
+        async with session.get(url) as resp:
+            resp.raise_for_status()
+            async with aiofiles.open(path, "wb") as f:
+                async for block in resp.content.iter_chunked(1024 * 1024):
+                    await f.write(block)
+    except BaseException:
+        _remove_quietly(path)  # Reserved or partial file (also on cancellation)
+        raise
+    return path
+
+
+def _new_async_session():
+    import aiohttp
+
+    return aiohttp.ClientSession(
+        headers={"User-Agent": _USER_AGENT},
+        timeout=aiohttp.ClientTimeout(total=None, sock_connect=60, sock_read=60),
+    )
+
+
 def download_media(url: str, output_dir: str = "downloaded_media") -> str:
     """
     Download video/audio from a URL to a local file.
 
     - YouTube / youtu.be / Vimeo / etc.: uses yt-dlp (requires ffmpeg for merge).
-    - Direct links (e.g. .mp4): downloaded with urllib.
+    - Direct links (e.g. .mp4): streamed with a pooled requests session.
 
     Args:
         url: HTTP(S) URL to the video or page (e.g. YouTube watch URL).
@@ -130,3 +202,64 @@ def download_media(url: str, output_dir: str = "downloaded_media") -> str:
     if _is_yt_dlp_domain(url):
         return _download_with_yt_dlp(url, output_dir)
     return _download_direct_url(url, output_dir)
+
+
+async def download_media_async(url: str, output_dir: str = "downloaded_media", session=None) -> str:
+    """
+    Async version of download_media, so several downloads can overlap on one event loop.
+
+    Direct links are streamed with aiohttp + aiofiles; yt-dlp sites run in a worker thread.
+
+    Args:
+        url: HTTP(S) URL to the video or page (e.g. YouTube watch URL).
+        output_dir: Directory to save the file (default: downloaded_media).
+        session: Optional aiohttp.ClientSession to reuse (one is created if None).
+
+    Returns:
+        Path to the downloaded file (e.g. .mp4).
+
+    Raises:
+        ValueError: Unsupported URL or download failure.
+    """
+    url = (url or "").strip()
+    if not is_url(url):
+        raise ValueError("Not a valid URL")
+    if _is_yt_dlp_domain(url):
+        return await asyncio.to_thread(_download_with_yt_dlp, url, output_dir)
+    if session is not None:
+        return await _download_direct_url_async(session, url, output_dir)
+    async with _new_async_session() as session:
+        return await _download_direct_url_async(session, url, output_dir)
+
+
+def download_media_batch(
+    urls: list[str],
+    output_dir: str = "downloaded_media",
+    max_concurrency: int = MAX_CONCURRENT_DOWNLOADS,
+) -> list[str | Exception]:
+    """
+    Download several URLs concurrently (at most max_concurrency at a time) on one event loop.
+
+    Args:
+        urls: HTTP(S) URLs to download.
+        output_dir: Directory to save the files (default: downloaded_media).
+        max_concurrency: Max downloads in flight at once (default 8).
+
+    Returns:
+        One entry per URL, in input order: the downloaded file path, or the exception
+        raised for that URL (one failed download does not cancel the others).
+    """
+
+    async def run() -> list[str | Exception]:
+        semaphore = asyncio.Semaphore(max_concurrency)
+        async with _new_async_session() as session:
+
+            async def download_one(url: str) -> str:
+                async with semaphore:
+                    return await download_media_async(url, output_dir, session=session)
+
+            return await asyncio.gather(*(download_one(u) for u in urls), return_exceptions=True)
+
+    if not urls:
+        return []
+    return asyncio.run(run())
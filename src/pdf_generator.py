@@ -1,6 +1,8 @@
 """Generate PDF from transcript text."""
 
 import os
+from collections.abc import Iterator
+from io import BytesIO
 from pathlib import Path
 
 from reportlab.lib.pagesizes import A4
@@ -9,6 +11,23 @@ from reportlab.lib.units import inch
 from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer
 
 
+# XML special chars escaped for ReportLab's Paragraph markup, in one str.translate pass
+_XML_ESCAPE = str.maketrans({"&": "&amp;", "<": "&lt;", ">": "&gt;"})
+
+
+def _iter_blocks(text: str) -> Iterator[str]:
+    """Yield non-empty, stripped paragraphs (split on blank lines) one at a time, without a list of all blocks."""
+    start = 0
+    while start <= len(text):
+        end = text.find("\n\n", start)
+        if end == -1:
+            end = len(text)
+        block = text[start:end].strip()
+        if block:
+            yield block
+        start = end + 2
+
+
 def transcript_to_pdf(
     text: str,
     output_path: str,
@@ -27,8 +46,10 @@ def transcript_to_pdf(
     """
     Path(output_path).parent.mkdir(parents=True, exist_ok=True)
 
+    # Render in memory and write the file in one go (no partial PDF left behind on errors)
+    buffer = BytesIO()
     doc = SimpleDocTemplate(
-        output_path,
+        buffer,
         pagesize=A4,
         rightMargin=inch,
         leftMargin=inch,
@@ -36,22 +57,20 @@ def transcript_to_pdf(
         bottomMargin=inch,
     )
     styles = getSampleStyleSheet()
-    story: list = []
-
-    story.append(Paragraph(title, styles["Title"]))
-    story.append(Spacer(1, 0.2 * inch))
+    normal = styles["Normal"]
 
-    # Split into paragraphs (double newline) or long lines
-    for block in text.split("\n\n"):
-        block = block.strip()
-        if not block:
-            continue
-        # Escape XML special chars for ReportLab
-        block = block.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
-        story.append(Paragraph(block, styles["Normal"]))
-        story.append(Spacer(1, 0.1 * inch))
+    # One paragraph per block (double newline); escape XML special chars for ReportLab
+    story: list = [Paragraph(title, styles["Title"]), Spacer(1, 0.2 * inch)]
+    story += [
+        item
+        for block in _iter_blocks(text)
+        # A fresh Spacer per block: ReportLab keeps layout state (e.g. _postponed) on flowables
+        for item in (Paragraph(block.translate(_XML_ESCAPE), normal), Spacer(1, 0.1 * inch))
+    ]
 
     doc.build(story)
+    with open(output_path, "wb") as f:
+        f.write(buffer.getbuffer())
     return output_path
 
 
@@ -1,12 +1,17 @@
 """Main pipeline: route uploads by type (video / PDF / DOCX) or URL; process."""
 
+import math
 import os
+import subprocess
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from itertools import repeat
 from pathlib import Path
 from typing import Any
 
-from src.audio_utils import extract_audio_from_video
+from src.audio_utils import extract_audio_from_video, get_media_duration
 from src.document_utils import extract_document_text
-from src.download_utils import download_media, is_url
+from src.download_utils import download_media, download_media_batch, is_url
 from src.pdf_generator import get_transcript_pdf_path, transcript_to_pdf
 from src.transcription import transcribe_long_audio
 from src.vector_store import add_chunked_to_vector_db
@@ -18,6 +23,21 @@ DOC_EXTENSIONS = {".pdf", ".docx"}
 DOCX_EXT = ".docx"
 DOC_EXT = ".doc"
 
+# Videos at least this long (seconds) are split into time ranges transcribed in parallel processes
+SHARD_MIN_DURATION_S = 600
+# Shard boundaries fall on multiples of the transcription chunk length
+SHARD_ALIGN_S = 30
+
+# Upload metadata copied into the vector DB metadata (missing keys are stored as "")
+_META_KEYS = ("video_id", "subject", "subject_id", "chapter", "chapter_id", "part", "user_id")
+
+
+def _build_meta(file_type: str, filename: str, metadata: dict[str, Any]) -> dict[str, Any]:
+    """Build the vector DB metadata for an upload."""
+    meta = {"file_type": file_type, "filename": filename}
+    meta.update((key, metadata.get(key, "")) for key in _META_KEYS)
+    return meta
+
 
 def _get_file_type(file_path: str) -> str:
     """Return 'video', 'pdf', 'docx', or 'unknown'."""
@@ -31,57 +51,128 @@ def _get_file_type(file_path: str) -> str:
     return "unknown"
 
 
+def _plan_shards(duration: float, n_shards: int) -> list[tuple[float, float]]:
+    """Split [0, duration) into at most n_shards (start, length) ranges aligned to SHARD_ALIGN_S."""
+    n_units = math.ceil(duration / SHARD_ALIGN_S)
+    units_per_shard = math.ceil(n_units / n_shards)
+    ranges = []
+    for unit in range(0, n_units, units_per_shard):
+        start = float(unit * SHARD_ALIGN_S)
+        ranges.append((start, min(units_per_shard * SHARD_ALIGN_S, duration - start)))
+    return ranges
+
+
+def _transcribe_video_range(
+    video_path: str,
+    start: float,
+    length: float,
+    output_audio_dir: str,
+    max_workers: int,
+) -> str:
+    """Extract and transcribe one time range of a video (runs in a worker process)."""
+    audio_path = extract_audio_from_video(
+        video_path, output_dir=output_audio_dir, start=start, duration=length
+    )
+    return transcribe_long_audio(audio_path, max_workers=max_workers)
+
+
+def _transcribe_video(
+    video_path: str,
+    output_audio_dir: str,
+    max_workers: int,
+    shards: int | None,
+) -> str:
+    """
+    Extract audio and transcribe a video.
+
+    Videos of SHARD_MIN_DURATION_S or longer are split into time ranges, each extracted
+    and transcribed by its own ffmpeg + ASR worker process; transcripts are joined by start time.
+    """
+    # At most max_workers shards, so max_workers bounds concurrent ASR requests across all shards
+    n_shards = min(shards or os.cpu_count() or 1, max_workers)
+    duration = 0.0
+    if n_shards > 1:
+        try:
+            duration = get_media_duration(video_path)
+        except (subprocess.CalledProcessError, ValueError):
+            pass  # Unknown duration: fall back to a single pass
+    if n_shards < 2 or duration < SHARD_MIN_DURATION_S:
+        audio_path = extract_audio_from_video(video_path, output_dir=output_audio_dir)
+        return transcribe_long_audio(audio_path, max_workers=max_workers)
+
+    ranges = _plan_shards(duration, n_shards)
+    workers_per_shard = max(1, max_workers // len(ranges))
+    with ProcessPoolExecutor(max_workers=len(ranges)) as executor:
+        texts = executor.map(
+            _transcribe_video_range,
+            repeat(video_path),
+            [start for start, _ in ranges],
+            [length for _, length in ranges],
+            repeat(output_audio_dir),
+            repeat(workers_per_shard),
+        )
+        return " ".join(t for t in texts if t).strip()
+
+
 def process_video(
     video_path: str,
     metadata: dict[str, Any],
     output_audio_dir: str = "output_audio_files",
     output_transcript_dir: str = "output_transcripts",
     chroma_dir: str = "chroma_db",
+    max_workers: int = 8,
+    shards: int | None = None,
+    store: bool = True,
 ) -> dict[str, Any]:
     """
     Process a video: extract audio → transcribe → create PDF → store in vector DB.
 
+    Long videos are split into time ranges that are extracted and transcribed in parallel.
+    PDF generation runs concurrently with the vector DB write.
+
     Args:
         video_path: Path to the video file.
         metadata: Metadata for vector DB (e.g. user_id, subject, subject_id, chapter, chapter_id, part).
         output_audio_dir: Directory for extracted audio.
         output_transcript_dir: Directory for transcript PDFs.
         chroma_dir: ChromaDB persist directory.
+        max_workers: Number of audio chunks transcribed concurrently.
+        shards: Max parallel time ranges for long videos (default: CPU count, capped at
+            max_workers; 1 disables).
+        store: If False, skip the vector DB write and return its metadata as vector_metadata.
 
     Returns:
-        Dict with keys: transcript_text, pdf_path, doc_id, success.
+        Dict with keys: transcript_text, pdf_path, doc_id, success (+ vector_metadata if not store).
+        If only the PDF fails, success is False with an error, and doc_id is set if already stored.
     """
     base_name = Path(video_path).stem
     result: dict[str, Any] = {"success": False, "transcript_text": "", "pdf_path": "", "doc_id": ""}
 
-    # 1. Extract audio from video
-    audio_path = extract_audio_from_video(video_path, output_dir=output_audio_dir)
-    # 2. Transcribe (chunked for long audio)
-    transcript = transcribe_long_audio(audio_path, output_dir=output_audio_dir)
+    # 1-2. Extract audio from video and transcribe (chunked; sharded by time range if long)
+    transcript = _transcribe_video(video_path, output_audio_dir, max_workers, shards)
     if not transcript:
         return result
 
     result["transcript_text"] = transcript
 
-    # 3. Create PDF of transcript
+    # Metadata for the vector DB (video_id = reference for filtering answers by video)
+    meta = _build_meta("video", os.path.basename(video_path), metadata)
+
+    # 3-4. Create the transcript PDF in a background thread while the transcript is
+    # chunked, embedded and stored in the vector DB
     pdf_path = get_transcript_pdf_path(base_name, output_dir=output_transcript_dir)
-    transcript_to_pdf(transcript, pdf_path, title=f"Transcript: {base_name}")
-    result["pdf_path"] = pdf_path
-
-    # 4. Store in vector DB with metadata (video_id = reference for filtering answers by video)
-    meta = {
-        "file_type": "video",
-        "filename": os.path.basename(video_path),
-        "video_id": metadata.get("video_id", ""),
-        "subject": metadata.get("subject", ""),
-        "subject_id": metadata.get("subject_id", ""),
-        "chapter": metadata.get("chapter", ""),
-        "chapter_id": metadata.get("chapter_id", ""),
-        "part": metadata.get("part", ""),
-        "user_id": metadata.get("user_id", ""),
-    }
-    source_id = add_chunked_to_vector_db(transcript, meta, source_id=None, persist_directory=chroma_dir)
-    result["doc_id"] = source_id
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        pdf_future = executor.submit(transcript_to_pdf, transcript, pdf_path, title=f"Transcript: {base_name}")
+        if store:
+            result["doc_id"] = add_chunked_to_vector_db(transcript, meta, source_id=None, persist_directory=chroma_dir)
+        else:
+            result["vector_metadata"] = meta
+        try:
+            result["pdf_path"] = pdf_future.result()
+        except Exception as e:
+            # The transcript may already be stored; keep doc_id so the caller can see it
+            result["error"] = f"Transcript PDF failed: {e}"
+            return result
     result["success"] = True
     return result
 
@@ -90,6 +181,8 @@ def process_document(
     file_path: str,
     metadata: dict[str, Any],
     chroma_dir: str = "chroma_db",
+    store: bool = True,
+    pdf_workers: int | None = None,
 ) -> dict[str, Any]:
     """
     Process a PDF or DOCX: extract text → store in vector DB.
@@ -98,29 +191,23 @@ def process_document(
         file_path: Path to the PDF or DOCX file.
         metadata: Metadata for vector DB.
         chroma_dir: ChromaDB persist directory.
+        store: If False, skip the vector DB write and return its metadata as vector_metadata.
+        pdf_workers: Worker processes for large PDFs (default: CPU count; 1 disables).
 
     Returns:
-        Dict with keys: text, doc_id, success.
+        Dict with keys: text, doc_id, success (+ vector_metadata if not store).
     """
     result: dict[str, Any] = {"success": False, "text": "", "doc_id": ""}
-    text = extract_document_text(file_path)
+    text = extract_document_text(file_path, max_workers=pdf_workers)
     if not text:
         return result
 
     result["text"] = text
-    meta = {
-        "file_type": Path(file_path).suffix.lstrip(".").lower(),
-        "filename": os.path.basename(file_path),
-        "video_id": metadata.get("video_id", ""),
-        "subject": metadata.get("subject", ""),
-        "subject_id": metadata.get("subject_id", ""),
-        "chapter": metadata.get("chapter", ""),
-        "chapter_id": metadata.get("chapter_id", ""),
-        "part": metadata.get("part", ""),
-        "user_id": metadata.get("user_id", ""),
-    }
-    source_id = add_chunked_to_vector_db(text, meta, source_id=None, persist_directory=chroma_dir)
-    result["doc_id"] = source_id
+    meta = _build_meta(Path(file_path).suffix.lstrip(".").lower(), os.path.basename(file_path), metadata)
+    if store:
+        result["doc_id"] = add_chunked_to_vector_db(text, meta, source_id=None, persist_directory=chroma_dir)
+    else:
+        result["vector_metadata"] = meta
     result["success"] = True
     return result
 
@@ -132,6 +219,10 @@ def process_upload(
     output_transcript_dir: str = "output_transcripts",
     chroma_dir: str = "chroma_db",
     download_dir: str = "downloaded_media",
+    max_workers: int = 8,
+    shards: int | None = None,
+    store: bool = True,
+    pdf_workers: int | None = None,
 ) -> dict[str, Any]:
     """
     Process an uploaded file or URL: video → transcript + PDF + vector DB; PDF/DOCX → vector DB.
@@ -145,6 +236,11 @@ def process_upload(
         output_transcript_dir: Directory for transcript PDFs (video only).
         chroma_dir: ChromaDB persist directory.
         download_dir: Directory for files downloaded from URLs (default: downloaded_media).
+        max_workers: Number of audio chunks transcribed concurrently (video only).
+        shards: Max parallel time ranges for long videos (default: CPU count, capped at
+            max_workers; 1 disables).
+        store: If False, skip the vector DB write and return its metadata as vector_metadata.
+        pdf_workers: Worker processes for large PDFs (default: CPU count; 1 disables).
 
     Returns:
         Result dict (success, transcript_text or text, pdf_path if video, doc_id).
@@ -166,8 +262,104 @@ def process_upload(
             output_audio_dir=output_audio_dir,
             output_transcript_dir=output_transcript_dir,
             chroma_dir=chroma_dir,
+            max_workers=max_workers,
+            shards=shards,
+            store=store,
         )
     if file_type in ("pdf", "docx"):
-        return process_document(file_path, metadata, chroma_dir=chroma_dir)
+        return process_document(
+            file_path, metadata, chroma_dir=chroma_dir, store=store, pdf_workers=pdf_workers
+        )
 
     return {"success": False, "error": f"Unsupported file type: {file_path}"}
+
+
+def process_uploads(
+    file_paths: list[str],
+    metadata_list: list[dict[str, Any] | None] | None = None,
+    output_audio_dir: str = "output_audio_files",
+    output_transcript_dir: str = "output_transcripts",
+    chroma_dir: str = "chroma_db",
+    download_dir: str = "downloaded_media",
+    max_workers: int = 8,
+    max_processes: int | None = None,
+) -> list[dict[str, Any]]:
+    """
+    Process several uploads (files or URLs) in parallel worker processes.
+
+    URLs are downloaded first, concurrently on one event loop. Each worker then extracts,
+    transcribes and builds the PDF for one upload; at most
+    max_processes run at once, which also bounds concurrent ffmpeg processes. Vector DB
+    writes happen afterwards in this process only, so ChromaDB has a single writer.
+
+    Args:
+        file_paths: Local paths and/or URLs.
+        metadata_list: Metadata per upload (same length as file_paths), or None for empty metadata.
+        output_audio_dir: Directory for extracted audio (video only).
+        output_transcript_dir: Directory for transcript PDFs (video only).
+        chroma_dir: ChromaDB persist directory.
+        download_dir: Directory for files downloaded from URLs.
+        max_workers: Number of audio chunks transcribed concurrently per video.
+        max_processes: Max uploads processed at once (default: CPU count).
+
+    Returns:
+        One result dict per upload, in input order (same keys as process_upload).
+    """
+    if metadata_list is None:
+        metadata_list = [None] * len(file_paths)
+    if len(metadata_list) != len(file_paths):
+        raise ValueError("metadata_list must have one entry per file path.")
+    if not file_paths:
+        return []
+
+    worker = partial(
+        process_upload,
+        output_audio_dir=output_audio_dir,
+        output_transcript_dir=output_transcript_dir,
+        chroma_dir=chroma_dir,
+        download_dir=download_dir,
+        max_workers=max_workers,
+        # Parallelism is across uploads; don't also fan out processes inside each one
+        shards=1,
+        pdf_workers=1,
+        store=False,
+    )
+    url_indexes = [i for i, path in enumerate(file_paths) if is_url(path)]
+    local_paths: list[str | None] = list(file_paths)
+    failed: dict[int, dict[str, Any]] = {}
+    if url_indexes:
+        downloaded = download_media_batch([file_paths[i] for i in url_indexes], output_dir=download_dir)
+        for i, path in zip(url_indexes, downloaded):
+            if isinstance(path, BaseException):
+                failed[i] = {"success": False, "error": f"Download failed: {path}"}
+                local_paths[i] = None
+            else:
+                local_paths[i] = path
+
+    n_processes = min(max_processes or os.cpu_count() or 1, len(file_paths))
+    results: list[dict[str, Any]] = []
+    with ProcessPoolExecutor(max_workers=n_processes) as executor:
+        futures = [
+            executor.submit(worker, path, meta) if path is not None else None
+            for path, meta in zip(local_paths, metadata_list)
+        ]
+        for i, future in enumerate(futures):
+            if future is None:
+                results.append(failed[i])
+                continue
+            try:
+                results.append(future.result())
+            except Exception as e:
+                results.append({"success": False, "error": str(e)})
+
+    for result in results:
+        meta = result.pop("vector_metadata", None)
+        if meta is None:
+            continue
+        text = result.get("transcript_text") or result.get("text", "")
+        try:
+            result["doc_id"] = add_chunked_to_vector_db(text, meta, source_id=None, persist_directory=chroma_dir)
+        except Exception as e:
+            result["success"] = False
+            result["error"] = f"Vector DB write failed: {e}"
+    return results
@@ -0,0 +1,231 @@
+"""Semantic cache for answered questions: serve near-identical questions without Chroma or Gemini."""
+
+import atexit
+import json
+import logging
+import os
+import tempfile
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+
+logger = logging.getLogger(__name__)
+
+
+class SemanticCache:
+    """
+    Cache answers keyed by question embeddings.
+
+    A lookup returns the stored result whose question embedding has cosine similarity
+    >= threshold with the new question, within the same scope (e.g. collection + video_id).
+    Each scope has a version (e.g. of the collection's content); when a scope is used with a
+    new version, its entries from the old version are dropped.
+    Entries live in a ring buffer of max_entries (the oldest entry is overwritten when full)
+    and are persisted to a .npz file every save_every new entries and at interpreter exit.
+    """
+
+    def __init__(
+        self,
+        path: str | None = None,
+        threshold: float = 0.95,
+        max_entries: int = 10_000,
+        save_every: int = 32,
+    ):
+        """
+        Args:
+            path: .npz file to load from and save to (None keeps the cache in memory only).
+            threshold: Minimum cosine similarity for a cache hit (default 0.95).
+            max_entries: Oldest entries are overwritten beyond this size.
+            save_every: Write the file after this many new entries (default 32).
+        """
+        self.path = path
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.save_every = save_every
+        self._vectors: np.ndarray | None = None  # (capacity, dim); rows [:len(self)] are in use
+        self._scope_ids = np.empty(0, dtype=np.int32)
+        self._scope_names: list[str] = []
+        self._scope_versions: list[str] = []  # Parallel to _scope_names
+        self._scope_index: dict[str, int] = {}
+        self._values: list[bytes] = []  # JSON-encoded results, one per slot
+        self._next = 0  # Slot written by the next set()
+        self._unsaved = 0
+        if path:
+            if Path(path).is_file():
+                try:
+                    self._load()
+                except Exception as e:
+                    logger.warning("Ignoring unreadable semantic cache %s: %s", path, e)
+                    self._reset(0)
+            atexit.register(self.save)
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def get(self, query_emb: list[float], scope: str = "", version: str = "") -> dict[str, Any] | None:
+        """Return the cached result for a semantically similar question in scope, or None."""
+        scope_id = self._scope_id(scope, version, create=False)
+        size = len(self._values)
+        if self._vectors is None or not size or scope_id is None:
+            return None
+        query = _normalize(np.asarray(query_emb, dtype=np.float32))
+        if query.shape[0] != self._vectors.shape[1]:
+            return None
+        sims = self._vectors[:size] @ query
+        sims[self._scope_ids[:size] != scope_id] = -1.0
+        best = int(np.argmax(sims))
+        if sims[best] < self.threshold:
+            return None
+        return json.loads(self._values[best])
+
+    def set(self, query_emb: list[float], value: dict[str, Any], scope: str = "", version: str = "") -> None:
+        """Store a result for a question embedding; the file is written every save_every entries."""
+        vector = _normalize(np.asarray(query_emb, dtype=np.float32))
+        if self._vectors is None or self._vectors.shape[1] != vector.shape[0]:
+            # First entry, or the embedding model changed: start over
+            self._reset(vector.shape[0])
+        # May drop this scope's entries from an older version, so look it up before picking a slot
+        scope_id = self._scope_id(scope, version, create=True)
+        size = len(self._values)
+        if size < self.max_entries and size == self._vectors.shape[0]:
+            self._grow()
+
+        slot = self._next
+        encoded = json.dumps(value, default=str).encode()
+        self._vectors[slot] = vector
+        self._scope_ids[slot] = scope_id
+        if slot == size:
+            self._values.append(encoded)
+        else:
+            self._values[slot] = encoded
+        self._next = (slot + 1) % self.max_entries
+
+        self._unsaved += 1
+        if self.path and self._unsaved >= self.save_every:
+            self.save()
+
+    def save(self) -> None:
+        """Write unsaved entries to the .npz path (atomically, via a unique temp file)."""
+        if not self.path or self._vectors is None or not self._unsaved:
+            return
+        size = len(self._values)
+        if len(np.unique(self._scope_ids[:size])) < len(self._scope_names):
+            # Some scopes lost all their entries to eviction: don't keep their names
+            self._compact(np.ones(size, dtype=bool))
+            size = len(self._values)
+        offsets = np.zeros(size + 1, dtype=np.int64)
+        np.cumsum([len(v) for v in self._values], out=offsets[1:])
+
+        directory = Path(self.path).parent
+        directory.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez(
+                    f,
+                    vectors=self._vectors[:size],
+                    scope_ids=self._scope_ids[:size],
+                    scope_names=np.array(self._scope_names, dtype=str),
+                    scope_versions=np.array(self._scope_versions, dtype=str),
+                    value_offsets=offsets,
+                    value_blob=np.frombuffer(b"".join(self._values), dtype=np.uint8),
+                    next_slot=np.int64(self._next),
+                )
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        self._unsaved = 0
+
+    def _load(self) -> None:
+        with np.load(self.path) as data:
+            vectors = data["vectors"].astype(np.float32)
+            scope_ids = data["scope_ids"].astype(np.int32)
+            scope_names = data["scope_names"].tolist()
+            scope_versions = data["scope_versions"].tolist()
+            offsets = data["value_offsets"].tolist()
+            blob = data["value_blob"].tobytes()
+            next_slot = int(data["next_slot"])
+        size = len(vectors)
+        if (
+            vectors.ndim != 2
+            or len(scope_ids) != size
+            or len(offsets) != size + 1
+            or len(scope_versions) != len(scope_names)
+        ):
+            raise ValueError("inconsistent array lengths")
+        if size and not 0 <= scope_ids.max() < len(scope_names):
+            raise ValueError("scope id out of range")
+
+        keep = min(size, self.max_entries)
+        self._vectors = vectors[:keep]
+        self._scope_ids = scope_ids[:keep]
+        self._scope_names = scope_names
+        self._scope_versions = scope_versions
+        self._scope_index = {name: i for i, name in enumerate(scope_names)}
+        self._values = [blob[offsets[i] : offsets[i + 1]] for i in range(keep)]
+        self._next = next_slot % self.max_entries if keep == size else 0
+
+    def _reset(self, dim: int) -> None:
+        self._vectors = np.empty((0, dim), dtype=np.float32)
+        self._scope_ids = np.empty(0, dtype=np.int32)
+        self._scope_names = []
+        self._scope_versions = []
+        self._scope_index = {}
+        self._values = []
+        self._next = 0
+
+    def _grow(self) -> None:
+        """Double the preallocated capacity (up to max_entries)."""
+        capacity = min(self.max_entries, max(64, 2 * self._vectors.shape[0]))
+        vectors = np.empty((capacity, self._vectors.shape[1]), dtype=np.float32)
+        vectors[: len(self._vectors)] = self._vectors
+        scope_ids = np.empty(capacity, dtype=np.int32)
+        scope_ids[: len(self._scope_ids)] = self._scope_ids
+        self._vectors, self._scope_ids = vectors, scope_ids
+
+    def _scope_id(self, scope: str, version: str, create: bool) -> int | None:
+        """Id of scope (None if unknown and not create); drops its entries if the version changed."""
+        scope_id = self._scope_index.get(scope)
+        if scope_id is not None and self._scope_versions[scope_id] != version:
+            size = len(self._values)
+            self._compact(self._scope_ids[:size] != scope_id)
+            self._unsaved += 1
+            scope_id = None
+        if scope_id is None and create:
+            scope_id = self._scope_index[scope] = len(self._scope_names)
+            self._scope_names.append(scope)
+            self._scope_versions.append(version)
+        return scope_id
+
+    def _compact(self, keep: np.ndarray) -> None:
+        """
+        Keep only the slots where keep is True, oldest first, and the scopes they reference.
+
+        Scope ids are renumbered; the next set() appends after the kept entries.
+        """
+        size = len(self._values)
+        if size == self.max_entries and self._next:
+            order = np.r_[self._next : size, 0 : self._next]  # Wrapped: oldest entry is at _next
+        else:
+            order = np.arange(size)
+        order = order[keep[order]]
+
+        used = np.zeros(len(self._scope_names), dtype=bool)
+        used[self._scope_ids[order]] = True
+        new_ids = (np.cumsum(used) - 1).astype(np.int32)
+
+        self._vectors = self._vectors[order]
+        self._scope_ids = new_ids[self._scope_ids[order]]
+        self._values = [self._values[i] for i in order]
+        self._scope_names = [n for n, u in zip(self._scope_names, used) if u]
+        self._scope_versions = [v for v, u in zip(self._scope_versions, used) if u]
+        self._scope_index = {name: i for i, name in enumerate(self._scope_names)}
+        self._next = len(self._values) % self.max_entries
+
+
+def _normalize(vector: np.ndarray) -> np.ndarray:
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
@@ -1,14 +1,55 @@
 """Transcribe audio using SpeechRecognition (Google Web Speech API)."""
 
+import time
+from collections import deque
+from collections.abc import Iterable
+from concurrent.futures import Future, ThreadPoolExecutor
+from urllib.error import HTTPError
+
 import speech_recognition as sr
 
 
-def audio_to_text(audio_path: str, verbose: bool = False) -> str | None:
+# HTTP reason phrases of Google Web Speech errors worth retrying (rate limit and 5xx)
+_TRANSIENT_REASONS = (
+    "Too Many Requests",
+    "Internal Server Error",
+    "Bad Gateway",
+    "Service Unavailable",
+    "Gateway Timeout",
+)
+
+
+def _is_transient(error: sr.RequestError) -> bool:
+    """True for rate-limit (429) and server (5xx) errors; False for bad keys, quota, no network, etc."""
+    # recognize_google raises RequestError while handling the urllib HTTPError
+    cause = error.__cause__ or error.__context__
+    if isinstance(cause, HTTPError):
+        return cause.code == 429 or 500 <= cause.code < 600
+    return any(reason in str(error) for reason in _TRANSIENT_REASONS)
+
+
+def _recognize_with_retry(
+    recognizer: sr.Recognizer,
+    audio_data: sr.AudioData,
+    retries: int = 3,
+    backoff_s: float = 1.0,
+) -> str:
+    """Call recognize_google, retrying rate-limit (429) and 5xx errors with exponential backoff."""
+    for attempt in range(retries + 1):
+        try:
+            return recognizer.recognize_google(audio_data)
+        except sr.RequestError as e:
+            if attempt == retries or not _is_transient(e):
+                raise
+            time.sleep(backoff_s * 2**attempt)
+
+
+def audio_data_to_text(audio_data: sr.AudioData, verbose: bool = False) -> str | None:
     """
-    Transcribe a single audio file using Google Web Speech API.
+    Transcribe in-memory audio using Google Web Speech API.
 
     Args:
-        audio_path: Path to WAV audio file.
+        audio_data: Audio to transcribe.
         verbose: If True, print a message when a segment cannot be transcribed.
 
     Returns:
@@ -16,11 +57,8 @@ def audio_to_text(audio_path: str, verbose: bool = False) -> str | None:
     """
     recognizer = sr.Recognizer()
 
-    with sr.AudioFile(audio_path) as source:
-        audio_data = recognizer.record(source)
-
     try:
-        text = recognizer.recognize_google(audio_data)
+        text = _recognize_with_retry(recognizer, audio_data)
         return text
     except sr.UnknownValueError:
         if verbose:
@@ -31,40 +69,93 @@ def audio_to_text(audio_path: str, verbose: bool = False) -> str | None:
     return None
 
 
+def audio_to_text(audio_path: str, verbose: bool = False) -> str | None:
+    """
+    Transcribe a single audio file using Google Web Speech API.
+
+    Args:
+        audio_path: Path to WAV audio file.
+        verbose: If True, print a message when a segment cannot be transcribed.
+
+    Returns:
+        Transcribed text or None on failure.
+    """
+    recognizer = sr.Recognizer()
+
+    with sr.AudioFile(audio_path) as source:
+        audio_data = recognizer.record(source)
+
+    return audio_data_to_text(audio_data, verbose=verbose)
+
+
+def transcribe_chunks_parallel(
+    chunks: Iterable[sr.AudioData],
+    max_workers: int = 8,
+) -> list[str | None]:
+    """
+    Transcribe audio chunks concurrently; results are returned in chunk order.
+
+    Each chunk is an independent, network-bound API call, so a thread pool overlaps the waits.
+    Each call builds its own Recognizer, so no recognizer state is shared between threads.
+    chunks is consumed lazily, keeping at most 2 * max_workers chunks in flight (bounded memory
+    when fed from a decoder).
+
+    Args:
+        chunks: In-memory audio chunks, in playback order.
+        max_workers: Maximum number of concurrent API requests (default 8).
+
+    Returns:
+        Transcribed text (or None on failure) per chunk, in the same order as chunks.
+    """
+    results: list[str | None] = []
+    pending: deque[Future] = deque()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for chunk in chunks:
+            if len(pending) >= 2 * max_workers:
+                results.append(pending.popleft().result())
+            pending.append(executor.submit(audio_data_to_text, chunk))
+        results.extend(future.result() for future in pending)
+    return results
+
+
 def transcribe_long_audio(
     audio_path: str,
     chunk_length_ms: int = 30_000,
-    output_dir: str = "output_audio_files",
+    max_workers: int = 8,
+    sample_rate: int = 16000,
 ) -> str:
     """
     Transcribe long audio by splitting into chunks and concatenating results.
 
+    One ffmpeg process decodes the audio and pipes fixed-length PCM chunks straight into
+    the recognizer; no chunk files are written to or read back from disk.
+
     Args:
-        audio_path: Path to the full audio file (WAV).
+        audio_path: Path to the full audio file.
         chunk_length_ms: Chunk length in ms (Google API works best with ~30s).
-        output_dir: Directory for temporary chunk files.
+        max_workers: Number of chunks transcribed concurrently (default 8).
+        sample_rate: Sample rate the audio is decoded to (default 16000).
 
     Returns:
         Full transcript text.
     """
-    from src.audio_utils import split_audio_into_chunks
+    from src.audio_utils import iter_pcm_chunks
 
-    chunks = split_audio_into_chunks(
-        audio_path,
-        chunk_length_ms=chunk_length_ms,
-        output_dir=output_dir,
+    chunks = (
+        sr.AudioData(pcm, sample_rate, 2)
+        for pcm in iter_pcm_chunks(audio_path, chunk_length_ms=chunk_length_ms, sample_rate=sample_rate)
     )
+    results = transcribe_chunks_parallel(chunks, max_workers=max_workers)
     parts: list[str] = []
     failed = 0
-    for path in chunks:
-        text = audio_to_text(path, verbose=False)
+    for text in results:
         if text:
             parts.append(text)
         else:
             failed += 1
     if failed > 0:
         print(
-            f"Note: {failed} of {len(chunks)} segments could not be transcribed "
+            f"Note: {failed} of {len(results)} segments could not be transcribed "
             "(often silence, background noise, or unclear speech)."
         )
     return " ".join(parts).strip()
@@ -1,14 +1,119 @@
 """Store documents and metadata in ChromaDB vector database."""
 
+import functools
 import os
+import platform
+import tempfile
 import uuid
 from pathlib import Path
 from typing import Any
 
 import chromadb
+import chromadb.errors
 from chromadb.config import Settings
 
 
+# Same model as Chroma's default embedding function, so vectors computed here stay
+# comparable with collections that Chroma embedded itself.
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+
+# What get_collection raises for a missing collection: NotFoundError (Chroma 1.x),
+# InvalidCollectionException (0.5-0.6) or ValueError (0.4)
+_COLLECTION_NOT_FOUND = tuple(
+    getattr(chromadb.errors, name)
+    for name in ("NotFoundError", "InvalidCollectionException")
+    if hasattr(chromadb.errors, name)
+) + (ValueError,)
+
+# Metadata for newly created collections. Embeddings are normalized, so cosine gives the same
+# ranking as L2; M=8 halves the graph links per vector (vs 16), and search_ef stays above the
+# default to keep recall for where-filtered queries, which Chroma filters after the HNSW search.
+COLLECTION_METADATA = {
+    "description": "Teacher uploads: video transcripts, PDFs, docs",
+    "hnsw:space": "cosine",
+    "hnsw:M": 8,
+    "hnsw:construction_ef": 80,
+    "hnsw:search_ef": 64,
+}
+
+
+def _use_quantized_embedder() -> bool:
+    """True if EMBEDDING_QUANTIZED is set (read at call time so .env files loaded later apply)."""
+    return os.environ.get("EMBEDDING_QUANTIZED", "").strip().lower() in ("1", "true", "yes")
+
+
+def _quantized_onnx_file() -> str:
+    """Pick the int8-quantized ONNX export of EMBEDDING_MODEL that matches this CPU."""
+    if platform.machine().lower() in ("arm64", "aarch64"):
+        return "onnx/model_qint8_arm64.onnx"
+    return "onnx/model_quint8_avx2.onnx"
+
+
+@functools.lru_cache(maxsize=None)
+def _get_embedder(model_name: str = EMBEDDING_MODEL, quantized: bool = False):
+    """
+    Load the SentenceTransformer once per process; None if sentence-transformers is not installed.
+
+    With quantized=True the int8 ONNX export is run on onnxruntime (needs sentence-transformers[onnx]);
+    output vectors are still float32, so they stay comparable with already-stored embeddings.
+    """
+    try:
+        from sentence_transformers import SentenceTransformer
+    except ImportError:
+        return None
+    if quantized:
+        return SentenceTransformer(
+            model_name,
+            backend="onnx",
+            model_kwargs={"file_name": _quantized_onnx_file()},
+        )
+    return SentenceTransformer(model_name)
+
+
+def encode_batch(texts: list[str], batch_size: int = 64) -> list[list[float]] | None:
+    """
+    Embed texts outside Chroma in batched forward passes (on GPU when available).
+
+    Args:
+        texts: Texts to embed.
+        batch_size: Texts per forward pass (default 64).
+
+    Returns:
+        One normalized embedding per text, or None if sentence-transformers is not installed
+        (callers then let Chroma embed with its default function).
+    """
+    embedder = _get_embedder(EMBEDDING_MODEL, _use_quantized_embedder())
+    if embedder is None:
+        return None
+    vectors = embedder.encode(
+        texts,
+        batch_size=batch_size,
+        normalize_embeddings=True,
+        convert_to_numpy=True,
+        show_progress_bar=False,
+    )
+    return vectors.tolist()
+
+
+@functools.lru_cache(maxsize=1024)
+def _embed_query_cached(text: str, quantized: bool) -> tuple[float, ...] | None:
+    vectors = encode_batch([text])
+    return tuple(vectors[0]) if vectors is not None else None
+
+
+def embed_query(text: str) -> list[float] | None:
+    """
+    Embed a query string, memoizing recent queries (LRU, 1024 entries).
+
+    Repeated questions, or one question run against several where-filters, are embedded once.
+
+    Returns:
+        The query embedding, or None if sentence-transformers is not installed.
+    """
+    vector = _embed_query_cached(text, _use_quantized_embedder())
+    return list(vector) if vector is not None else None
+
+
 def chunk_text(
     text: str,
     chunk_size: int = 500,
@@ -32,24 +137,33 @@ def chunk_text(
         return [text]
     chunks: list[str] = []
     start = 0
-    step = chunk_size - overlap
     while start < len(text):
         end = start + chunk_size
-        chunk = text[start:end]
-        # Prefer breaking at sentence end (., !, ?) or space
+        # Prefer breaking at sentence end (., !, ?) or space, in the second half of the chunk.
+        # Search text in place within bounds (no per-chunk substring copy, half the scan).
         if end < len(text):
             for sep in (". ", "! ", "? ", " "):
-                last = chunk.rfind(sep)
-                if last > chunk_size // 2:
-                    chunk = chunk[: last + len(sep)].strip()
-                    end = start + len(chunk)
+                last = text.rfind(sep, start + chunk_size // 2 + 1, end)
+                if last != -1:
+                    end = last + len(sep)
                     break
-        if chunk.strip():
-            chunks.append(chunk.strip())
+        chunk = text[start:end].strip()
+        if chunk:
+            chunks.append(chunk)
         start = end
     return chunks
 
 
+@functools.lru_cache(maxsize=8)
+def _get_client(persist_directory: str):
+    """Open the PersistentClient once per directory; reused so SQLite/HNSW state loads only once."""
+    Path(persist_directory).mkdir(parents=True, exist_ok=True)
+    return chromadb.PersistentClient(
+        path=persist_directory,
+        settings=Settings(anonymized_telemetry=False),
+    )
+
+
 def get_or_create_collection(
     persist_directory: str = "chroma_db",
     collection_name: str = "teacher_content",
@@ -57,6 +171,9 @@ def get_or_create_collection(
     """
     Get or create a ChromaDB collection for teacher content.
 
+    New collections are created with COLLECTION_METADATA (HNSW index settings); existing
+    collections keep the settings they were created with, since Chroma cannot change them.
+
     Args:
         persist_directory: Directory to persist the database.
         collection_name: Name of the collection.
@@ -64,15 +181,60 @@ def get_or_create_collection(
     Returns:
         ChromaDB collection.
     """
-    Path(persist_directory).mkdir(parents=True, exist_ok=True)
-    client = chromadb.PersistentClient(
-        path=persist_directory,
-        settings=Settings(anonymized_telemetry=False),
-    )
-    return client.get_or_create_collection(
-        name=collection_name,
-        metadata={"description": "Teacher uploads: video transcripts, PDFs, docs"},
-    )
+    client = _get_client(os.path.abspath(persist_directory))
+    try:
+        return client.get_collection(name=collection_name)
+    except _COLLECTION_NOT_FOUND:
+        pass
+    try:
+        return client.create_collection(name=collection_name, metadata=COLLECTION_METADATA)
+    except Exception as create_error:
+        # Another process may have created it since get_collection ("already exists";
+        # the exception type differs between Chroma versions)
+        try:
+            return client.get_collection(name=collection_name)
+        except _COLLECTION_NOT_FOUND:
+            raise create_error from None
+
+
+def _version_file(persist_directory: str, collection_name: str) -> Path:
+    return Path(persist_directory) / f"{collection_name}.version"
+
+
+def get_collection_version(
+    persist_directory: str = "chroma_db",
+    collection_name: str = "teacher_content",
+) -> str:
+    """
+    Return a token that changes every time documents are written to the collection.
+
+    Used to invalidate answers cached for older content ("0" if nothing was written yet).
+    """
+    try:
+        return _version_file(persist_directory, collection_name).read_text().strip() or "0"
+    except FileNotFoundError:
+        return "0"
+
+
+def _bump_collection_version(persist_directory: str, collection_name: str) -> None:
+    path = _version_file(persist_directory, collection_name)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    with os.fdopen(fd, "w") as f:
+        f.write(uuid.uuid4().hex)
+    os.replace(tmp_path, path)
+
+
+def _sanitize_metadata(metadata: dict[str, Any]) -> dict[str, Any]:
+    """Drop None values and stringify anything Chroma can't store (it accepts str, int, float, bool)."""
+    safe_meta = {}
+    for k, v in metadata.items():
+        if v is None:
+            continue
+        if isinstance(v, (str, int, float, bool)):
+            safe_meta[k] = v
+        else:
+            safe_meta[k] = str(v)
+    return safe_meta
 
 
 def add_to_vector_db(
@@ -88,7 +250,7 @@ def add_to_vector_db(
     Args:
         text: Document text to embed and store.
         metadata: Metadata dict (e.g. user_id, subject, subject_id, chapter, chapter_id, part, file_type).
-        doc_id: Optional unique ID; if None, one is generated.
+        doc_id: Optional unique ID; if None, one is generated. An existing doc_id is replaced.
         persist_directory: ChromaDB persist path.
         collection_name: Collection name.
 
@@ -100,24 +262,19 @@ def add_to_vector_db(
 
     collection = get_or_create_collection(persist_directory, collection_name)
 
-    # Chroma expects metadata values to be str, int, float, or bool
-    safe_meta = {}
-    for k, v in metadata.items():
-        if v is None:
-            continue
-        if isinstance(v, (str, int, float, bool)):
-            safe_meta[k] = v
-        else:
-            safe_meta[k] = str(v)
+    safe_meta = _sanitize_metadata(metadata)
 
     if doc_id is None:
         doc_id = str(uuid.uuid4())
 
-    collection.add(
-        documents=[text.strip()],
+    documents = [text.strip()]
+    collection.upsert(
+        documents=documents,
+        embeddings=encode_batch(documents),
         metadatas=[safe_meta],
         ids=[doc_id],
     )
+    _bump_collection_version(persist_directory, collection_name)
     return doc_id
 
 
@@ -138,7 +295,8 @@ def add_chunked_to_vector_db(
     Args:
         text: Full document text (transcript or extracted PDF/DOCX).
         metadata: Metadata for all chunks (subject, chapter, filename, etc.).
-        source_id: Optional ID for this upload; if None, one is generated.
+        source_id: Optional ID for this upload; if None, one is generated. Re-ingesting an
+            existing source_id replaces all of its stored chunks.
         chunk_size: Characters per chunk (default 500).
         overlap: Overlap between chunks (default 80).
         persist_directory: ChromaDB persist path.
@@ -154,32 +312,35 @@ def add_chunked_to_vector_db(
     if not chunks:
         raise ValueError("Chunking produced no chunks.")
 
+    replacing = source_id is not None
     if source_id is None:
         source_id = str(uuid.uuid4())
 
     collection = get_or_create_collection(persist_directory, collection_name)
     total_chunks = len(chunks)
 
-    # Chroma expects metadata values to be str, int, float, or bool
-    base_meta = {}
-    for k, v in metadata.items():
-        if v is None:
-            continue
-        if isinstance(v, (str, int, float, bool)):
-            base_meta[k] = v
-        else:
-            base_meta[k] = str(v)
+    # Sanitized once; each chunk gets a shallow copy plus its own fields
+    base_meta = _sanitize_metadata(metadata)
+    base_meta["total_chunks"] = total_chunks
+    base_meta["source_id"] = source_id
 
-    ids: list[str] = []
-    documents: list[str] = []
+    ids = [f"{source_id}_chunk_{i}" for i in range(total_chunks)]
+    documents = chunks
     metadatas: list[dict[str, Any]] = []
-    for i, chunk in enumerate(chunks):
-        ids.append(f"{source_id}_chunk_{i}")
-        documents.append(chunk)
-        meta = {**base_meta, "chunk_index": i, "total_chunks": total_chunks, "source_id": source_id}
+    for i in range(total_chunks):
+        meta = base_meta.copy()
+        meta["chunk_index"] = i
         metadatas.append(meta)
 
-    collection.add(ids=ids, documents=documents, metadatas=metadatas)
+    # One batched embedding pass for all chunks (None → Chroma embeds them itself)
+    embeddings = encode_batch(documents)
+    collection.upsert(ids=ids, documents=documents, embeddings=embeddings, metadatas=metadatas)
+    if replacing:
+        # Drop chunks left over from a longer earlier version of this source
+        collection.delete(
+            where={"$and": [{"source_id": source_id}, {"chunk_index": {"$gte": total_chunks}}]}
+        )
+    _bump_collection_version(persist_directory, collection_name)
     return source_id
 
 
@@ -189,11 +350,12 @@ def query_vector_db(
     where: dict | None = None,
     persist_directory: str = "chroma_db",
     collection_name: str = "teacher_content",
+    query_embedding: list[float] | None = None,
 ):
     """
     Ask a question and get the most relevant documents (semantic search).
 
-    ChromaDB embeds your query and finds documents whose embeddings are closest.
+    The query is embedded once (see embed_query; memoized) and Chroma finds documents whose embeddings are closest.
     Use where to filter by metadata (e.g. {"video_id": "v123"} to get only that video's chunks).
 
     Args:
@@ -202,15 +364,20 @@ def query_vector_db(
         where: Optional metadata filter, e.g. {"video_id": "v123"}. Only matching chunks are searched.
         persist_directory: ChromaDB persist path.
         collection_name: Collection name.
+        query_embedding: Precomputed embedding of query_text (skips embedding it again).
 
     Returns:
         dict with keys: ids, documents, metadatas, distances (lower = more similar).
     """
     collection = get_or_create_collection(persist_directory, collection_name)
-    kwargs = {
-        "query_texts": [query_text],
-        "n_results": min(n_results, collection.count()),
-    }
+    # Chroma clamps n_results to what the index holds, so no count() round-trip is needed
+    kwargs = {"n_results": n_results}
+    if query_embedding is None:
+        query_embedding = embed_query(query_text)
+    if query_embedding is None:
+        kwargs["query_texts"] = [query_text]
+    else:
+        kwargs["query_embeddings"] = [query_embedding]
     if where:
         kwargs["where"] = where
     result = collection.query(**kwargs)